@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BookmarksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'bookmarks'
\ No newline at end of file
+    name = 'bookmarks'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the receivers)
+
+        # Opt-in so management commands don't load ~2 GB of models; under
+        # gunicorn --preload the loaded weights are shared by all workers.
+        if getattr(settings, 'PRELOAD_MODELS', False):
+            from .utils import _warmup
+            _warmup()
@@ -0,0 +1,7 @@
+"""
+Cache names shared by the views that fill the caches and the signal
+receivers that empty them.
+"""
+
+HOME_SIDEBAR_CACHE_KEY = "home_sidebar"
+PAGE_CACHE = "pages"  # cache alias for whole rendered pages
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+import numpy as np
+
+from bookmarks.models import Bookmark
+from bookmarks.utils import pack_embedding, rebuild_index, unpack_embedding
+
+
+class Command(BaseCommand):
+    help = "Scale stored embeddings to unit length and rebuild the FAISS index."
+
+    def handle(self, *args, **options):
+        items = []
+        for bm in Bookmark.full.only("id", "embedding").exclude(embedding=None).iterator():
+            vec = np.asarray(unpack_embedding(bm.embedding), dtype="float32")
+            norm = np.linalg.norm(vec)
+            if norm == 0:
+                continue
+            vec = (vec / norm).tolist()
+            bm.embedding = pack_embedding(vec)
+            bm.save(update_fields=["embedding"])
+            items.append((bm.id, vec))
+
+        count = rebuild_index(items)
+        self.stdout.write(self.style.SUCCESS(f"Re-indexed {count} bookmark(s)."))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-15 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0003_remove_bookmark_url_bookmarklink'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookmark',
+            index=models.Index(fields=['-created_at'], name='bookmark_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookmark',
+            index=models.Index(fields=['-view_count'], name='bookmark_views_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.11 on 2026-10-15 04:40
+
+from django.db import migrations, models
+
+
+def json_to_fp16(apps, schema_editor):
+    import numpy as np
+    Bookmark = apps.get_model("bookmarks", "Bookmark")
+    for bm in Bookmark.objects.exclude(embedding=None).only("id", "embedding").iterator():
+        bm.embedding_fp16 = np.asarray(bm.embedding, dtype="float16").tobytes()
+        bm.save(update_fields=["embedding_fp16"])
+
+
+def fp16_to_json(apps, schema_editor):
+    import numpy as np
+    Bookmark = apps.get_model("bookmarks", "Bookmark")
+    for bm in Bookmark.objects.exclude(embedding_fp16=None).only("id", "embedding_fp16").iterator():
+        bm.embedding = np.frombuffer(bm.embedding_fp16, dtype="float16").astype("float32").tolist()
+        bm.save(update_fields=["embedding"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0004_bookmark_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='embedding_fp16',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_fp16, fp16_to_json),
+        migrations.RemoveField(
+            model_name='bookmark',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='bookmark',
+            old_name='embedding_fp16',
+            new_name='embedding',
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-15 04:55
+
+from django.db import migrations, models
+
+
+# PostgreSQL only: a stored tsvector over title/description/text with a GIN
+# index, queried by the search view.  It is a generated column, so the model
+# does not declare it and no code has to keep it up to date.  The input is
+# capped because PostgreSQL rejects tsvectors over 1 MB, which would make
+# saving a bookmark with a large extracted text fail.
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE bookmarks_bookmark ADD COLUMN search_vec tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', left("
+        "coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(text, ''), "
+        "100000))) STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX bookmark_search_vec_gin ON bookmarks_bookmark USING gin (search_vec)"
+    )
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("ALTER TABLE bookmarks_bookmark DROP COLUMN search_vec")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookmarks', '0005_bookmark_embedding_fp16'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookmark',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='bookmarklink',
+            name='url',
+            field=models.URLField(db_index=True),
+        ),
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
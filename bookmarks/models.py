@@ -1,5 +1,5 @@
 from __future__ import annotations
-from django.db import models
+from django.db import connection, models
 from django.urls import reverse
 
 class Category(models.Model):
@@ -10,6 +10,21 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def descendant_ids(cls, root_id: int) -> list[int]:
+        """Return ``root_id`` plus the ids of all its descendants in one query."""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        sql = (
+            f"WITH RECURSIVE t(id) AS ("
+            f" SELECT id FROM {table} WHERE id = %s"
+            f" UNION"
+            f" SELECT c.id FROM {table} c JOIN t ON c.parent_id = t.id"
+            f") SELECT id FROM t"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [root_id])
+            return [row[0] for row in cursor.fetchall()]
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -17,15 +32,34 @@ class Tag(models.Model):
         return self.name
 
 
+class BookmarkManager(models.Manager):
+    """Default manager: leaves out the bulky extracted text and vector.
+
+    Only processing needs them; it reads through ``Bookmark.full``.
+    """
+    def get_queryset(self):
+        return super().get_queryset().defer("embedding", "text")
+
+
 class Bookmark(models.Model):
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL)
     tags = models.ManyToManyField(Tag, blank=True)
     text = models.TextField(blank=True)
-    embedding = models.JSONField(null=True, blank=True)
+    embedding = models.BinaryField(null=True, blank=True)  # float16 bytes, see utils.pack_embedding
     created_at = models.DateTimeField(auto_now_add=True)
     view_count = models.PositiveIntegerField(default=0)  # Track views
+
+    objects = BookmarkManager()
+    full = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="bookmark_created_idx"),
+            models.Index(fields=["-view_count"], name="bookmark_views_idx"),
+        ]
+
     def __str__(self):
         return self.title
     def get_absolute_url(self):
@@ -42,6 +76,6 @@ class BookmarkFile(models.Model):
 # New Model to Handle Multiple URLs for Each Bookmark
 class BookmarkLink(models.Model):
     bookmark = models.ForeignKey(Bookmark, related_name="links", on_delete=models.CASCADE)
-    url = models.URLField()
+    url = models.URLField(db_index=True)
     def __str__(self):
         return self.url
@@ -0,0 +1,23 @@
+"""
+Signal receivers for SmartBookmarks.
+
+The home and statistics pages are cached for 60 s (see views.py); any
+change to a bookmark or category drops the cached copies.  With the default
+in-process LocMemCache only the process that made the change is cleared, so
+other web workers and saves made in the Celery worker can serve stale pages
+until the TTL runs out; point CACHES at a shared backend to avoid that.
+"""
+
+from django.core.cache import cache, caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_keys import HOME_SIDEBAR_CACHE_KEY, PAGE_CACHE
+from .models import Bookmark, Category
+
+
+@receiver([post_save, post_delete], sender=Bookmark)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_page_cache(sender, **kwargs):
+    caches[PAGE_CACHE].clear()
+    cache.delete(HOME_SIDEBAR_CACHE_KEY)
@@ -0,0 +1,32 @@
+"""
+Celery tasks for SmartBookmarks.
+
+Bookmark processing (fetching, embedding, tagging, indexing) is slow, so the
+views hand it to a worker through ``utils.schedule_processing``.
+"""
+
+from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from .models import Bookmark
+from . import utils
+
+
+@shared_task
+def process_bookmark_task(bookmark_id: int) -> None:
+    bookmark = Bookmark.full.filter(pk=bookmark_id).first()
+    if bookmark is None:            # deleted before the worker got to it
+        return
+    utils.process_bookmark(bookmark)
+
+
+@worker_process_init.connect
+def _load_models(**kwargs) -> None:
+    """Pay the model loading cost once per worker process, not per task."""
+    utils._warmup()
+
+
+@worker_process_shutdown.connect
+def _flush_index(**kwargs) -> None:
+    """Prefork children exit via os._exit(), which skips atexit hooks."""
+    utils.flush_faiss()
@@ -4,26 +4,48 @@ Utility functions for SmartBookmarks.
 • Text extraction  (PDF, DOCX, plain text, URL)
 • Embedding        (Sentence-Transformers)
 • Auto-tagging     (zero-shot, transformers)
-• Vector search    (FAISS index + JSON map)
+• Vector search    (FAISS index + position → bookmark map)
 """
 
 from __future__ import annotations
 
-import json, os, re
+import asyncio, atexit, json, os, re, shutil, tempfile, threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterable, List
 
 from django.conf import settings
+from django.db import transaction
 from .models import Bookmark, Tag
 
+try:
+    import fcntl
+except ImportError:     # Windows: no cross-process lock, run a single writer
+    fcntl = None
+
 # ────────────────────────────────────────────────────────────
 # 0. Paths for the vector store
 # ────────────────────────────────────────────────────────────
 BASE_DATA_DIR   = Path(getattr(settings, "BASE_DATA_DIR", settings.BASE_DIR))
-VECTOR_MAP_FILE = getattr(settings, "VECTOR_MAP_FILE", BASE_DATA_DIR / "vector_map.json")
+VECTOR_MAP_FILE = getattr(settings, "VECTOR_MAP_FILE", BASE_DATA_DIR / "vector_map.csv")
 FAISS_INDEX_FILE = getattr(settings, "FAISS_INDEX_FILE", BASE_DATA_DIR / "faiss.index")
 
 
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on ``path + ".lock"`` (across processes)."""
+    lock_path = Path(path).with_name(Path(path).name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as fp:
+        if fcntl is not None:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+
 # ────────────────────────────────────────────────────────────
 # 1.  Text extraction
 # ────────────────────────────────────────────────────────────
@@ -32,11 +54,20 @@ def extract_text_from_file(file_path: str) -> str:
     ext = os.path.splitext(file_path)[1].lower()
 
     if ext == ".pdf":
+        pdfium_error = None
+        try:
+            return _extract_pdf_pdfium(file_path)
+        except ImportError:
+            pass
+        except Exception as exc:    # malformed PDF: let pdfminer have a go
+            pdfium_error = exc
         try:
             from pdfminer.high_level import extract_text
-            return extract_text(file_path)
         except ImportError as exc:
-            raise RuntimeError("Install pdfminer.six for PDF support") from exc
+            if pdfium_error is not None:
+                raise pdfium_error
+            raise RuntimeError("Install pypdfium2 or pdfminer.six for PDF support") from exc
+        return extract_text(file_path)
 
     if ext in {".docx", ".doc"}:
         try:
@@ -51,91 +82,602 @@ def extract_text_from_file(file_path: str) -> str:
         return fp.read()
 
 
+def _extract_pdf_pdfium(file_path: str) -> str:
+    """Extract PDF text with PDFium, closing each page as soon as it is read."""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        parts = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                parts.append(textpage.get_text_range())
+            finally:
+                textpage.close()
+                page.close()
+        return "\n".join(parts)
+    finally:
+        pdf.close()
+
+
+def _strip_html(html: str) -> str:
+    """Return the visible text of a buffered HTML page.
+
+    Only used when lxml is missing (see ``_HTMLTextStream``): tries
+    selectolax, and the regex strip is a last resort since it backtracks
+    badly on large pages.
+    """
+    if not html.strip():
+        return ""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        return " ".join(re.sub("<[^<]+?>", " ", html).split())  # naive HTML strip
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style", "noscript"])
+    root = tree.body or tree.root
+    return root.text(separator=" ", strip=True) if root is not None else ""
+
+
+class _HTMLTextStream:
+    """Turn HTML fed in chunks into its visible text.
+
+    With lxml the chunks go straight into a parser whose target keeps only
+    text nodes, so the page is never held in memory as one string. Without
+    lxml the chunks are buffered and handed to ``_strip_html``.
+    """
+    _SKIP = {"head", "script", "style", "noscript"}
+    # Tags that separate words; inline tags (b, a, span...) must not, or
+    # "<b>H</b>ello" would split.
+    _BREAK = {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl",
+        "dt", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+        "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "option", "p",
+        "pre", "section", "table", "td", "th", "tr", "ul",
+    }
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._skip = 0
+        self._fed = False
+        try:
+            from lxml import etree
+        except ImportError:
+            self._parser = None
+        else:
+            self._parser = etree.HTMLParser(target=self)
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self._fed = True
+        if self._parser is None:
+            self._parts.append(chunk)
+        else:
+            self._parser.feed(chunk)
+
+    def text(self) -> str:
+        if self._parser is None:
+            return _strip_html("".join(self._parts))
+        return self._parser.close() if self._fed else ""
+
+    # lxml parser-target callbacks
+    def start(self, tag, attrib):
+        if tag in self._SKIP:
+            self._skip += 1
+        elif tag in self._BREAK:
+            self._parts.append(" ")
+
+    def end(self, tag):
+        if tag in self._SKIP and self._skip:
+            self._skip -= 1
+        elif tag in self._BREAK:
+            self._parts.append(" ")
+
+    def data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def close(self):
+        return " ".join("".join(self._parts).split())
+
+
 def extract_text_from_url(url: str) -> str:
     try:
         import requests
     except ImportError as exc:
         raise RuntimeError("Install requests for URL fetching") from exc
 
-    r = requests.get(url, timeout=10)
-    r.raise_for_status()
-    return re.sub("<[^<]+?>", "", r.text)          # naive HTML strip
+    with requests.get(url, timeout=10, stream=True) as r:
+        r.raise_for_status()
+        r.encoding = r.encoding or "utf-8"
+        stream = _HTMLTextStream()
+        for chunk in r.iter_content(8192, decode_unicode=True):
+            stream.feed(chunk)
+        return stream.text()
+
+
+URL_FETCH_CONCURRENCY = getattr(settings, "URL_FETCH_CONCURRENCY", 8)
+
+
+def extract_text_from_urls(urls: List[str]) -> List[str | Exception]:
+    """Fetch ``urls`` concurrently; a failed URL yields its exception.
+
+    Uses one pooled ``httpx.AsyncClient`` when httpx is installed, otherwise
+    falls back to fetching one by one with ``extract_text_from_url``.
+    """
+    try:
+        import httpx
+    except ImportError:
+        results: List[str | Exception] = []
+        for url in urls:
+            try:
+                results.append(extract_text_from_url(url))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    async def fetch(client, sem, url):
+        async with sem, client.stream("GET", url) as r:
+            r.raise_for_status()
+            stream = _HTMLTextStream()
+            async for chunk in r.aiter_text(8192):
+                stream.feed(chunk)
+            return stream.text()
+
+    async def fetch_all():
+        sem = asyncio.Semaphore(URL_FETCH_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
+            return await asyncio.gather(*(fetch(client, sem, u) for u in urls),
+                                        return_exceptions=True)
+
+    return asyncio.run(fetch_all()) if urls else []
 
 
 # ────────────────────────────────────────────────────────────
 # 2.  Embeddings
 # ────────────────────────────────────────────────────────────
+# Models are process-wide singletons, loaded on first use or up front by
+# ``_warmup`` (AppConfig.ready / Celery worker start).
+_MINILM = None
+_ZSHOT = None
+
+
+def _shrink_model(model):
+    """Half precision on GPU, dynamically quantized int8 Linear layers on CPU.
+
+    Torch builds without a quantized engine keep the fp32 model.
+    """
+    import torch
+    if next(model.parameters()).is_cuda:
+        return model.half()
+    try:
+        return torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    except Exception as exc:        # e.g. NoQEngine
+        print("int8 quantization unavailable, using fp32:", exc)
+        return model
+
+
+def _embedding_model():
+    global _MINILM
+    if _MINILM is None:
+        from sentence_transformers import SentenceTransformer
+        _MINILM = _shrink_model(SentenceTransformer("all-MiniLM-L6-v2"))
+    return _MINILM
+
+
+def _chunks(text: str, n: int | None = None) -> List[str]:
+    """Split ``text`` into pieces of at most ``n`` MiniLM tokens.
+
+    ``n`` defaults to what fits in the model window next to [CLS]/[SEP].
+    """
+    model = _embedding_model()
+    n = n or model.max_seq_length - 2
+    enc = model.tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+    )
+    offsets = enc["offset_mapping"]
+    return [
+        text[offsets[i][0]:offsets[min(i + n, len(offsets)) - 1][1]]
+        for i in range(0, len(offsets), n)
+    ]
+
+
 def generate_embedding(text: str) -> List[float]:
-    """Return a 384-D MiniLM vector."""
-    from sentence_transformers import SentenceTransformer
-    if not hasattr(generate_embedding, "_model"):
-        generate_embedding._model = SentenceTransformer("all-MiniLM-L6-v2")
-    return generate_embedding._model.encode(text, convert_to_numpy=True).tolist()
+    """Return a unit-length 384-D MiniLM vector (dot product == cosine).
+
+    Long text is embedded chunk by chunk in one batch and mean-pooled, so
+    nothing past the model's token window is silently dropped.
+    """
+    import numpy as np
+    vecs = _embedding_model().encode(
+        _chunks(text) or [text], batch_size=32, show_progress_bar=False,
+        convert_to_numpy=True, normalize_embeddings=True,
+    )
+    mean = vecs.mean(axis=0)
+    return (mean / (np.linalg.norm(mean) or 1.0)).tolist()
+
+
+# Bookmark.embedding is stored as raw float16 bytes (768 B for 384-D) rather
+# than a JSON list of floats.
+def pack_embedding(vec: Iterable[float]) -> bytes:
+    import numpy as np
+    return np.asarray(vec, dtype="float16").tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    import numpy as np
+    return np.frombuffer(data, dtype="float16").astype("float32").tolist()
 
 
 # ────────────────────────────────────────────────────────────
 # 3.  Auto-tagging
 # ────────────────────────────────────────────────────────────
+# Every chunk costs one NLI pass per candidate label, so only the leading
+# chunks of very long documents are classified.
+AUTO_TAG_MAX_CHUNKS = getattr(settings, "AUTO_TAG_MAX_CHUNKS", 8)
+
+# A lighter MNLI model such as "valhalla/distilbart-mnli-12-1" can be set here.
+ZERO_SHOT_MODEL    = getattr(settings, "ZERO_SHOT_MODEL", "facebook/bart-large-mnli")
+ZERO_SHOT_ONNX_DIR = Path(getattr(settings, "ZERO_SHOT_ONNX_DIR", BASE_DATA_DIR / "onnx"))
+
+
+def _zero_shot_pipeline():
+    """Build the zero-shot classifier, on int8 ONNX Runtime when available.
+
+    The first run exports ZERO_SHOT_MODEL to ONNX and dynamically quantizes
+    it under ZERO_SHOT_ONNX_DIR; later runs load the quantized file. Without
+    ``optimum[onnxruntime]`` installed the PyTorch pipeline is used, shrunk
+    by ``_shrink_model``.
+    """
+    from transformers import AutoTokenizer, pipeline
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError:
+        import torch
+        clf = pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL,
+                       device=0 if torch.cuda.is_available() else -1)
+        clf.model = _shrink_model(clf.model)
+        return clf
+
+    model_dir = ZERO_SHOT_ONNX_DIR / ZERO_SHOT_MODEL.replace("/", "--")
+    quantized = model_dir / "model_quantized.onnx"
+    if not quantized.exists():
+        # Every worker may warm up at once: export under a lock into a temp
+        # dir and move it into place whole, so a crash or a concurrent export
+        # never leaves a torn model behind that passes the check above.
+        model_dir.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(model_dir):
+            if not quantized.exists():
+                tmp = Path(tempfile.mkdtemp(prefix=f"{model_dir.name}.", dir=model_dir.parent))
+                try:
+                    ORTModelForSequenceClassification.from_pretrained(
+                        ZERO_SHOT_MODEL, export=True
+                    ).save_pretrained(tmp)
+                    AutoTokenizer.from_pretrained(ZERO_SHOT_MODEL).save_pretrained(tmp)
+                    quantize_dynamic(tmp / "model.onnx", tmp / quantized.name,
+                                     weight_type=QuantType.QInt8)
+                    shutil.rmtree(model_dir, ignore_errors=True)   # earlier partial export
+                    os.replace(tmp, model_dir)
+                finally:
+                    shutil.rmtree(tmp, ignore_errors=True)
+
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_dir, file_name=quantized.name
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+def _zero_shot_model():
+    global _ZSHOT
+    if _ZSHOT is None:
+        _ZSHOT = _zero_shot_pipeline()
+    return _ZSHOT
+
+
 def auto_tag(text: str,
              candidate_labels: Iterable[str] | None = None,
              threshold: float = 0.3) -> List[str]:
-    from transformers import pipeline
     if candidate_labels is None:
         candidate_labels = [
             "natural language processing", "machine learning", "deep learning",
             "computer vision", "data science", "ai", "tutorial", "paper",
             "web development", "python", "chat log", "research",
         ]
-    if not hasattr(auto_tag, "_clf"):
-        auto_tag._clf = pipeline("zero-shot-classification",
-                                 model="facebook/bart-large-mnli")
-    res = auto_tag._clf(text, list(candidate_labels))
-    return [lbl for lbl, scr in zip(res["labels"], res["scores"]) if scr >= threshold]
+    labels = list(candidate_labels)
+    chunks = (_chunks(text) or [text])[:AUTO_TAG_MAX_CHUNKS]
+    results = _zero_shot_model()(chunks, labels)
+    if isinstance(results, dict):       # single input comes back unwrapped
+        results = [results]
+    # Average each label's score over the chunks before thresholding
+    totals = dict.fromkeys(labels, 0.0)
+    for res in results:
+        for lbl, scr in zip(res["labels"], res["scores"]):
+            totals[lbl] += scr
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+    return [lbl for lbl, scr in ranked if scr / len(results) >= threshold]
+
+
+def _warmup() -> None:
+    """Load both models now so no request pays the cold-start cost.
+
+    A failure is only reported; the models then load lazily on first use.
+    """
+    try:
+        _embedding_model()
+        _zero_shot_model()
+    except Exception as exc:
+        print("Model preload failed:", exc)
 
 
 # ────────────────────────────────────────────────────────────
 # 4.  FAISS helpers
 # ────────────────────────────────────────────────────────────
-def _load_faiss():
-    import faiss
-    vec_map = {}
+# The live index and id map are kept in-process and only written back by
+# ``flush_faiss`` (periodically and at exit), so an insert no longer costs a
+# full read + write of the index file.  Several processes (Celery children,
+# web workers) may insert at once: flushes are serialized with a lock file,
+# and a process that finds the index was flushed by someone else since it
+# loaded re-reads it and replays its own pending inserts on top.
+FAISS_FLUSH_INTERVAL = getattr(settings, "FAISS_FLUSH_INTERVAL", 30)
+
+# HNSW graph parameters: links per node and search-time beam width.
+FAISS_HNSW_M         = getattr(settings, "FAISS_HNSW_M", 32)
+FAISS_HNSW_EF_SEARCH = getattr(settings, "FAISS_HNSW_EF_SEARCH", 64)
+
+_INDEX_STATE = {
+    "index": None,
+    "map": None,
+    "stamp": None,   # identity of FAISS_INDEX_FILE when last read/written
+    "pending": [],   # (bookmark_id, vector) inserted since the last flush
+    "timer": None,
+    "lock": threading.Lock(),
+}
+
+
+def _index_stamp():
+    try:
+        st = os.stat(FAISS_INDEX_FILE)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _faiss_file_lock():
+    """Hold an exclusive lock file next to the index (across processes)."""
+    return _file_lock(FAISS_INDEX_FILE)
+
+
+def _replace_file(path, write) -> None:
+    """Write ``path`` via a temp file so readers never see it half-written."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    write(str(tmp))
+    os.replace(tmp, path)
+
+
+# The vector map is an append-only log of "pos,bookmark_id" lines; a later
+# line for the same position wins.  Maps written by older versions as one
+# JSON object are converted on first load.  In memory it is an int64 array
+# indexed by FAISS position, with -1 marking positions without a bookmark.
+def _vec_map_array(pairs: dict[int, int]):
+    import numpy as np
+    arr = np.full(max(pairs, default=-1) + 1, -1, dtype=np.int64)
+    if pairs:
+        arr[np.fromiter(pairs.keys(), np.int64)] = np.fromiter(pairs.values(), np.int64)
+    return arr
+
+
+def _load_legacy_vec_map(path):
+    """Convert a JSON map from an older version and rewrite it as the log."""
+    with open(path, "r", encoding="utf-8") as fp:
+        pairs = {int(k): int(v) for k, v in json.load(fp).items()}
+    vec_map = _vec_map_array(pairs)
+    _write_vec_map(vec_map)
+    return vec_map
+
+
+def _read_vec_map():
+    pairs: dict[int, int] = {}
     if VECTOR_MAP_FILE.exists():
         with open(VECTOR_MAP_FILE, "r", encoding="utf-8") as fp:
-            vec_map = json.load(fp)
-    index = faiss.read_index(str(FAISS_INDEX_FILE)) if FAISS_INDEX_FILE.exists() else None
-    return index, vec_map
+            if fp.read(4096).lstrip().startswith("{"):   # VECTOR_MAP_FILE still a .json map
+                return _load_legacy_vec_map(VECTOR_MAP_FILE)
+            fp.seek(0)
+            for line in fp:
+                if not line.strip():
+                    continue
+                try:                        # a crash can leave a torn last line
+                    pos, bid = map(int, line.split(","))
+                except ValueError:
+                    print("Skipping bad vector map line:", line.rstrip())
+                    continue
+                pairs[pos] = bid
+        return _vec_map_array(pairs)
+    legacy = VECTOR_MAP_FILE.with_suffix(".json")
+    if not legacy.exists():
+        return _vec_map_array(pairs)
+    return _load_legacy_vec_map(legacy)
+
+
+def _write_vec_map(vec_map) -> None:
+    import numpy as np
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as fp:
+            fp.writelines(f"{pos},{vec_map[pos]}\n" for pos in np.flatnonzero(vec_map >= 0))
+
+    _replace_file(VECTOR_MAP_FILE, write)
+
+
+def _append_vec_map(entries: Iterable[tuple[int, int]]) -> None:
+    VECTOR_MAP_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(VECTOR_MAP_FILE, "ab+") as fp:
+        if fp.seek(0, os.SEEK_END):
+            fp.seek(-1, os.SEEK_END)
+            if fp.read(1) != b"\n":
+                fp.write(b"\n")            # close off a torn last line
+        fp.write("".join(f"{pos},{bid}\n" for pos, bid in entries).encode("utf-8"))
+        fp.flush()
+        os.fsync(fp.fileno())
+
+
+def _read_faiss() -> None:
+    """Replace the in-memory index and map with what is on disk."""
+    import faiss
+    state = _INDEX_STATE
+    stamp = _index_stamp()
+    state["index"] = faiss.read_index(str(FAISS_INDEX_FILE)) if stamp is not None else None
+    state["map"] = _read_vec_map()
+    state["stamp"] = stamp
 
 
-def _save_faiss(index, vec_map):
+def _load_faiss():
+    """Return the cached (index, vec_map); re-read only if the file changed.
+
+    With inserts pending, the on-disk index is only picked up at the next
+    flush.  Callers must hold ``_INDEX_STATE["lock"]``.
+    """
+    state = _INDEX_STATE
+    if state["map"] is None or (not state["pending"] and _index_stamp() != state["stamp"]):
+        _read_faiss()
+    return state["index"], state["map"]
+
+
+def _insert(bookmark_id: int, vec) -> None:
+    """Append one vector to the in-memory index and map. Caller holds the lock."""
+    import numpy as np
+    state = _INDEX_STATE
+    if state["index"] is None:
+        state["index"] = _new_index(vec.shape[1])
+    index, vec_map = state["index"], state["map"]
+    pos = index.ntotal
+    index.add(vec)
+    if pos >= len(vec_map):                 # grow geometrically, pad with -1
+        grown = np.full(max(2 * len(vec_map), pos + 1), -1, dtype=np.int64)
+        grown[:len(vec_map)] = vec_map
+        vec_map = state["map"] = grown
+    vec_map[pos] = bookmark_id
+
+
+def _save_faiss(index) -> None:
+    """Write ``index``; ``None`` (an emptied index) removes the file."""
     import faiss
-    FAISS_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
-    VECTOR_MAP_FILE.parent.mkdir(parents=True, exist_ok=True)
-    if index is not None:
-        faiss.write_index(index, str(FAISS_INDEX_FILE))
-    with open(VECTOR_MAP_FILE, "w", encoding="utf-8") as fp:
-        json.dump(vec_map, fp)
+    if index is None:
+        Path(FAISS_INDEX_FILE).unlink(missing_ok=True)
+        return
+    _replace_file(FAISS_INDEX_FILE, lambda tmp: faiss.write_index(index, tmp))
+
+
+def flush_faiss() -> None:
+    """Write pending inserts to disk, merging with other processes' flushes."""
+    state = _INDEX_STATE
+    with state["lock"]:
+        state["timer"] = None
+        pending = state["pending"]
+        if not pending:
+            return
+        with _faiss_file_lock():
+            if _index_stamp() != state["stamp"]:
+                # Someone else flushed since we loaded: start from their
+                # index and re-add our vectors at the positions after it.
+                _read_faiss()
+                for bookmark_id, vec in pending:
+                    _insert(bookmark_id, vec)
+            index = state["index"]
+            first = index.ntotal - len(pending)
+            # Map lines go first: a reader that sees the new index must
+            # also see its ids; extra lines past ntotal are harmless.
+            _append_vec_map((first + i, bid) for i, (bid, _) in enumerate(pending))
+            _save_faiss(index)
+            state["stamp"] = _index_stamp()
+            state["pending"] = []
+
+
+def _schedule_flush() -> None:
+    """Schedule a flush of pending inserts. Caller holds the lock."""
+    state = _INDEX_STATE
+    if state["timer"] is None:
+        timer = threading.Timer(FAISS_FLUSH_INTERVAL, flush_faiss)
+        timer.daemon = True
+        timer.start()
+        state["timer"] = timer
+
+
+atexit.register(flush_faiss)
+
+
+def _new_index(dim: int):
+    """Create an empty approximate (HNSW) inner-product index.
+
+    Embeddings are unit length, so inner product ranks by cosine similarity.
+    """
+    import faiss
+    return faiss.IndexHNSWFlat(dim, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+
+
+def rebuild_index(items: Iterable[tuple[int, List[float]]]) -> int:
+    """Replace the index with ``(bookmark_id, embedding)`` pairs; return the count.
+
+    Written to disk straight away, discarding any pending inserts.
+    """
+    import numpy as np
+    ids, vecs = [], []
+    for bookmark_id, emb in items:
+        ids.append(bookmark_id)
+        vecs.append(emb)
+    state = _INDEX_STATE
+    with state["lock"], _faiss_file_lock():
+        index = None
+        if vecs:
+            mat = np.asarray(vecs, dtype="float32")
+            index = _new_index(mat.shape[1])
+            index.add(mat)
+        state["index"] = index
+        state["map"] = np.asarray(ids, dtype=np.int64)
+        state["pending"] = []
+        _write_vec_map(state["map"])
+        _save_faiss(index)
+        state["stamp"] = _index_stamp()
+    return len(ids)
 
 
 def add_embedding_to_index(bookmark_id: int, emb: List[float]) -> None:
-    import faiss, numpy as np
-    index, vec_map = _load_faiss()
+    import numpy as np
     vec = np.asarray([emb], dtype="float32")
-    if index is None:
-        index = faiss.IndexFlatL2(vec.shape[1])
-    pos = index.ntotal
-    index.add(vec)
-    vec_map[str(pos)] = bookmark_id
-    _save_faiss(index, vec_map)
+    with _INDEX_STATE["lock"]:
+        _load_faiss()
+        _insert(bookmark_id, vec)
+        _INDEX_STATE["pending"].append((bookmark_id, vec))
+        _schedule_flush()
 
 
 def search_embeddings(query_vec: List[float], k: int = 10) -> List[int]:
-    import faiss, numpy as np
-    index, vec_map = _load_faiss()
-    if index is None or index.ntotal == 0:
-        return []
+    import numpy as np
     q = np.asarray([query_vec], dtype="float32")
-    _, idxs = index.search(q, min(k, index.ntotal))
-    return [int(vec_map[str(i)]) for i in idxs[0] if str(i) in vec_map]
+    with _INDEX_STATE["lock"]:
+        index, vec_map = _load_faiss()
+        if index is None or index.ntotal == 0:
+            return []
+        if hasattr(index, "hnsw"):          # indexes written before HNSW are flat
+            index.hnsw.efSearch = max(FAISS_HNSW_EF_SEARCH, 2 * k)
+        # Over-fetch: a bookmark processed more than once (e.g. after an
+        # edit) has several vectors, and duplicates are collapsed below.
+        _, idxs = index.search(q, min(2 * k, index.ntotal))
+    pos = idxs[0]
+    ids = vec_map[pos[(pos >= 0) & (pos < len(vec_map))]]
+    ids = ids[ids >= 0]
+    # FAISS returns hits best-first, so each bookmark's first occurrence is
+    # its best score: keep that one, in rank order.
+    _, first = np.unique(ids, return_index=True)
+    return ids[np.sort(first)][:k].tolist()
 
 
 # ────────────────────────────────────────────────────────────
@@ -146,12 +688,13 @@ def process_bookmark(bookmark: Bookmark) -> None:
     """Extract text from URL + all attached files, then embed/tag/index."""
     chunks: list[str] = []
 
-    # URLs: Access the related BookmarkLink model for URLs
-    for link in bookmark.links.all():
-        try:
-            chunks.append(extract_text_from_url(link.url))  # Extract text from each URL in BookmarkLink
-        except Exception as exc:
-            print("URL extraction failed:", exc)
+    # URLs: Access the related BookmarkLink model for URLs, fetched concurrently
+    urls = [link.url for link in bookmark.links.all()]
+    for text in extract_text_from_urls(urls):
+        if isinstance(text, Exception):
+            print("URL extraction failed:", text)
+        else:
+            chunks.append(text)
 
     # Attached files
     for bf in bookmark.files.all():
@@ -164,14 +707,20 @@ def process_bookmark(bookmark: Bookmark) -> None:
     bookmark.text = full_text
 
     # Embedding
+    emb = None
     if full_text:
         try:
-            bookmark.embedding = generate_embedding(full_text)
+            emb = generate_embedding(full_text)
+            bookmark.embedding = pack_embedding(emb)
         except Exception as exc:
             bookmark.embedding = None
             print("Embedding failed:", exc)
+    elif bookmark.embedding:
+        emb = unpack_embedding(bookmark.embedding)
 
-    bookmark.save()
+    # Only the derived columns: processing may run in a worker while the
+    # bookmark is being viewed or edited.
+    bookmark.save(update_fields=["text", "embedding"])
 
     # Auto-tag
     if full_text:
@@ -183,8 +732,21 @@ def process_bookmark(bookmark: Bookmark) -> None:
             print("Auto-tagging failed:", exc)
 
     # FAISS
-    if bookmark.embedding:
+    if emb:
         try:
-            add_embedding_to_index(bookmark.id, bookmark.embedding)
+            add_embedding_to_index(bookmark.id, emb)
         except Exception as exc:
             print("FAISS update failed:", exc)
+
+
+def schedule_processing(bookmark: Bookmark) -> None:
+    """Run ``process_bookmark`` on a Celery worker once the row is committed.
+
+    Falls back to processing inline when Celery is not installed.
+    """
+    try:
+        from .tasks import process_bookmark_task
+    except ImportError:
+        transaction.on_commit(lambda: process_bookmark(Bookmark.full.get(pk=bookmark.pk)))
+        return
+    transaction.on_commit(lambda: process_bookmark_task.delay(bookmark.id))
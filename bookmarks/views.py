@@ -1,20 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+from django.views.decorators.vary import vary_on_cookie
+from django.db import connection, transaction
+from django.db.models import BooleanField, Q, Count, F, Subquery
+from django.db.models.expressions import RawSQL
+from .cache_keys import HOME_SIDEBAR_CACHE_KEY, PAGE_CACHE
 from .models import Bookmark, BookmarkFile, Category, BookmarkLink
 from .forms import BookmarkForm, CategoryForm, SingleBookmarkForm, MultiBookmarkLinkForm
-from .utils import process_bookmark
+from .utils import schedule_processing
 
 
 # Home Page View
+def _home_sidebar():
+    # Only the columns the home cards render; both lists walk an index.
+    cards = Bookmark.objects.only("id", "title", "view_count", "created_at")
+    return {
+        "recent_bookmarks": list(cards.order_by("-created_at")[:5]),
+        "popular_bookmarks": list(cards.order_by("-view_count")[:5]),  # Most viewed bookmarks
+    }
+
+
+@cache_page(60, cache=PAGE_CACHE)
+@vary_on_cookie  # flash messages ride on cookies; never serve them to others
 def home(request):
     cats = Category.objects.filter(parent__isnull=True)
-    rec = Bookmark.objects.order_by("-created_at")[:5]
-    popular_bookmarks = Bookmark.objects.order_by("-view_count")[:5]  # Most viewed bookmarks
+    sidebar = cache.get_or_set(HOME_SIDEBAR_CACHE_KEY, _home_sidebar, 60)
     return render(request, "bookmarks/home.html", {
         "categories": cats,
-        "recent_bookmarks": rec,
-        "popular_bookmarks": popular_bookmarks
+        **sidebar,
     })
 
 
@@ -35,23 +50,28 @@ def upload_bookmark(request):
 
     if request.method == "POST":
         if form.is_valid() and link_form.is_valid():
-            # Save the bookmark
-            bookmark = form.save()
-
-            # Save the files
-            files = request.FILES.getlist("files")
-            for f in files:
-                BookmarkFile.objects.create(bookmark=bookmark, file=f)
-
-            # Save the URLs from the link form
-            links = link_form.cleaned_data['links']
-            if links:
-                urls = links.strip().splitlines()
-                for url in urls:
-                    BookmarkLink.objects.create(bookmark=bookmark, url=url)
-
-            # Process the bookmark (e.g., for embeddings, etc.)
-            process_bookmark(bookmark)
+            # One transaction for the bookmark and all its attachments
+            with transaction.atomic():
+                # Save the bookmark
+                bookmark = form.save()
+
+                # Save the files
+                files = request.FILES.getlist("files")
+                BookmarkFile.objects.bulk_create(
+                    [BookmarkFile(bookmark=bookmark, file=f) for f in files],
+                    batch_size=500,
+                )
+
+                # Save the URLs from the link form
+                links = link_form.cleaned_data['links']
+                BookmarkLink.objects.bulk_create(
+                    [BookmarkLink(bookmark=bookmark, url=url.strip())
+                     for url in links.splitlines() if url.strip()],
+                    batch_size=500,
+                )
+
+                # Process the bookmark (e.g., for embeddings, etc.) in the background
+                schedule_processing(bookmark)
 
             messages.success(request, "Bookmark saved with attachments and URLs.")
             return redirect("bookmark_detail", pk=bookmark.id)
@@ -70,14 +90,28 @@ def search(request):
     results = []
 
     if q:
-        # Search across multiple fields (title, description, tags, URLs)
-        results = Bookmark.objects.filter(
-            Q(title__icontains=q) |
-            Q(description__icontains=q) |
+        # Search across multiple fields (title, description, tags, URLs).
+        # Matching ids are collected in a subquery so the outer query needs
+        # no DISTINCT over the joined rows.
+        text_match = Q(title__icontains=q) | Q(description__icontains=q)
+        if connection.vendor == "postgresql":
+            # Full-text match on the GIN-indexed search_vec column (migration
+            # 0006), which also covers the extracted text
+            text_match = Q(RawSQL(
+                "search_vec @@ plainto_tsquery('english', %s)", [q],
+                output_field=BooleanField(),
+            ))
+        matches = Bookmark.objects.filter(
+            text_match |
             Q(tags__name__icontains=q) |
             Q(files__file__icontains=q) |
             Q(links__url__icontains=q)  # Search URLs in BookmarkLink model
-        ).distinct()
+        ).values("pk")
+        results = (
+            Bookmark.objects.filter(pk__in=Subquery(matches))
+            .prefetch_related("files", "links")  # rendered per result
+            .order_by("-created_at")
+        )
 
     return render(request, "bookmarks/search.html", {
         "query": q,
@@ -88,17 +122,10 @@ def search(request):
 # Category Detail View (with descendants)
 def category_detail(request, pk: int):
     cat = get_object_or_404(Category, pk=pk)
-    
-    # Recursive function to collect all descendant category ids
-    def collect_category_ids(category):
-        category_ids = [category.id]
-        for child in category.children.all():
-            category_ids.extend(collect_category_ids(child))
-        return category_ids
-
-    # Collect all categories under this one (including descendants)
-    ids = collect_category_ids(cat)
-    
+
+    # Collect this category and all of its descendants in a single query
+    ids = Category.descendant_ids(cat.pk)
+
     # Fetch bookmarks related to these categories
     bmarks = Bookmark.objects.filter(category_id__in=ids).order_by("-created_at")
     
@@ -112,9 +139,9 @@ def category_detail(request, pk: int):
 def bookmark_detail(request, pk: int):
     bookmark = get_object_or_404(Bookmark, pk=pk)
 
-    # Increment the view count by 1
+    # Increment the view count by 1 without rewriting the rest of the row
+    Bookmark.objects.filter(pk=pk).update(view_count=F("view_count") + 1)
     bookmark.view_count += 1
-    bookmark.save()
 
     # Create a shareable URL for this bookmark
     share_url = request.build_absolute_uri(bookmark.get_absolute_url())
@@ -138,11 +165,13 @@ def bookmark_edit(request, pk: int):
             if delete_ids:
                 BookmarkFile.objects.filter(id__in=delete_ids, bookmark=bm).delete()
 
-            for f in request.FILES.getlist("new_files"):
-                BookmarkFile.objects.create(bookmark=bm, file=f)
+            BookmarkFile.objects.bulk_create(
+                [BookmarkFile(bookmark=bm, file=f) for f in request.FILES.getlist("new_files")],
+                batch_size=500,
+            )
 
-            # Re-run processing (e.g., embeddings, tagging)
-            process_bookmark(bm)
+            # Re-run processing (e.g., embeddings, tagging) in the background
+            schedule_processing(bm)
 
             messages.success(request, "Bookmark updated.")
             return redirect("bookmark_detail", pk=bm.id)
@@ -179,6 +208,8 @@ def delete_category(request, pk: int):
 
 
 # Statistics View (overview of total bookmarks and bookmarks per category)
+@cache_page(60, cache=PAGE_CACHE)
+@vary_on_cookie
 def statistics(request):
     total_bookmarks = Bookmark.objects.count()  # Total number of bookmarks
     categories_count = Bookmark.objects.values('category').annotate(num_bookmarks=Count('category'))  # Count bookmarks per category
@@ -1,6 +1,13 @@
 """
 Package initializer for the smartbookmarks Django project.
 
-Keeping this file empty indicates that this directory should
-be treated as a Python package.
+Loads the Celery app (if Celery is installed) so ``@shared_task``
+functions bind to it when Django starts.
 """
+
+try:
+    from .celery import app as celery_app
+except ImportError:  # Celery is optional; bookmarks are then processed inline
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -0,0 +1,17 @@
+"""
+Celery application for the smartbookmarks project.
+
+Start a worker with::
+
+    celery -A smartbookmarks worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartbookmarks.settings')
+
+app = Celery('smartbookmarks')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
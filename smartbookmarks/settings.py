@@ -88,6 +88,22 @@ DATABASES = {
     }
 }
 
+# Caches: in-process memory for development.  LocMemCache is private to each
+# process, so invalidation on save only reaches the process that saved; other
+# workers serve their copy until it expires.  In production switch both
+# to 'django.core.cache.backends.redis.RedisCache' with a redis:// LOCATION,
+# giving 'pages' a database of its own: it holds whole rendered pages and
+# is cleared wholesale whenever a bookmark or category changes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,4 +144,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # index updated.  You may wish to store these files outside of the
 # repository in production.
 FAISS_INDEX_FILE = BASE_DIR / 'faiss.index'
-VECTOR_MAP_FILE = BASE_DIR / 'vector_map.json'
\ No newline at end of file
+VECTOR_MAP_FILE = BASE_DIR / 'vector_map.csv'
+
+# Celery: bookmark processing runs on a worker.  Point CELERY_BROKER_URL
+# at Redis (e.g. redis://localhost:6379/0) in production; without it,
+# tasks run eagerly in-process so development needs no broker.
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'memory://')
+CELERY_TASK_ALWAYS_EAGER = 'CELERY_BROKER_URL' not in os.environ
+
+# Load the embedding and zero-shot models when Django starts instead of on
+# the first bookmark processed.  Set PRELOAD_MODELS=1 for web servers that
+# process bookmarks inline; Celery workers always preload.
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS') == '1'